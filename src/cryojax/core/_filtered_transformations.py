@@ -18,18 +18,19 @@ def filter_grad_with_spec(
     *,
     has_aux: bool = False,
 ) -> Callable:
+    # Build the transformed function once, rather than on every call
+    @partial(
+        eqx.filter_grad,
+        has_aux=has_aux,
+    )
+    def recombine_fn(
+        pytree_if_true: PyTree, pytree_if_false: PyTree, *args: Any, **kwargs: Any
+    ):
+        pytree = eqx.combine(pytree_if_true, pytree_if_false, is_leaf=is_leaf)
+        return func(pytree, *args, **kwargs)
+
     @wraps(func)
     def partition_and_recombine_fn(pytree: PyTree, *args: Any, **kwargs: Any):
-        @partial(
-            eqx.filter_grad,
-            has_aux=has_aux,
-        )
-        def recombine_fn(
-            pytree_if_true: PyTree, pytree_if_false: PyTree, *args: Any, **kwargs: Any
-        ):
-            pytree = eqx.combine(pytree_if_true, pytree_if_false, is_leaf=is_leaf)
-            return func(pytree, *args, **kwargs)
-
         pytree_if_true, pytree_if_false = eqx.partition(
             pytree, filter_spec, is_leaf=is_leaf
         )
@@ -45,18 +46,19 @@ def filter_value_and_grad_with_spec(
     *,
     has_aux: bool = False,
 ) -> Callable:
+    # Build the transformed function once, rather than on every call
+    @partial(
+        eqx.filter_value_and_grad,
+        has_aux=has_aux,
+    )
+    def recombine_fn(
+        pytree_if_true: PyTree, pytree_if_false: PyTree, *args: Any, **kwargs: Any
+    ):
+        pytree = eqx.combine(pytree_if_true, pytree_if_false, is_leaf=is_leaf)
+        return func(pytree, *args, **kwargs)
+
     @wraps(func)
     def partition_and_recombine_fn(pytree: PyTree, *args: Any, **kwargs: Any):
-        @partial(
-            eqx.filter_value_and_grad,
-            has_aux=has_aux,
-        )
-        def recombine_fn(
-            pytree_if_true: PyTree, pytree_if_false: PyTree, *args: Any, **kwargs: Any
-        ):
-            pytree = eqx.combine(pytree_if_true, pytree_if_false, is_leaf=is_leaf)
-            return func(pytree, *args, **kwargs)
-
         pytree_if_true, pytree_if_false = eqx.partition(
             pytree, filter_spec, is_leaf=is_leaf
         )
@@ -79,27 +81,36 @@ def filter_vmap_with_spec(
     axis_name: Hashable = None,
     axis_size: Optional[int] = None,
 ) -> Callable:
-    @wraps(func)
-    def partition_and_recombine_fn(pytree: PyTree, *args: Any):
-        @partial(
-            eqx.filter_vmap,
-            in_axes=(in_axes, None),
-            out_axes=out_axes,
-            axis_name=axis_name,
-            axis_size=axis_size,
-        )
-        def recombine_fn(
-            pytree_if_true_with_args: tuple[PyTree, ...],
-            pytree_if_false: PyTree,
-        ):
-            pytree_if_true, *args = pytree_if_true_with_args
+    # Split the in_axes between the pytree and the remaining arguments
+    if isinstance(in_axes, tuple):
+        pytree_in_axes, args_in_axes = in_axes[0], in_axes[1:]
+    else:
+        pytree_in_axes, args_in_axes = in_axes, in_axes
 
-            pytree = eqx.combine(pytree_if_true, pytree_if_false, is_leaf=is_leaf)
-            return func(pytree, *args)
+    # Build the transformed function once, binding in_axes and out_axes
+    # at construction time rather than on every call
+    @partial(
+        eqx.filter_vmap,
+        in_axes=(pytree_in_axes, None, args_in_axes),
+        out_axes=out_axes,
+        axis_name=axis_name,
+        axis_size=axis_size,
+    )
+    def recombine_fn(
+        pytree_if_true: PyTree,
+        pytree_if_false: PyTree,
+        args: tuple[Any, ...],
+    ):
+        pytree = eqx.combine(pytree_if_true, pytree_if_false, is_leaf=is_leaf)
+        return func(pytree, *args)
 
+    @wraps(func)
+    def partition_and_recombine_fn(pytree: PyTree, *args: Any):
         pytree_if_true, pytree_if_false = eqx.partition(
             pytree, filter_spec, is_leaf=is_leaf
         )
-        return recombine_fn((pytree_if_true, *args), pytree_if_false)
+        # ... forward the arguments tuple as-is, rather than repacking it
+        # together with the partitioned pytree on every call
+        return recombine_fn(pytree_if_true, pytree_if_false, args)
 
     return partition_and_recombine_fn
@@ -2,9 +2,11 @@
 Routines to compute FFTs, in cryojax conventions.
 """
 
+from functools import lru_cache
 from typing import Any, Optional, overload
 
 import jax.numpy as jnp
+import numpy as np
 from jaxtyping import Array, Complex, Float, Inexact
 
 
@@ -49,7 +51,11 @@ def ifftn(
     ift :
         Inverse fourier transform.
     """
-    ift = jnp.fft.fftshift(jnp.fft.ifftn(ft, axes=axes, **kwargs), axes=axes)
+    signs = _get_shift_signs(ft.shape, axes, **kwargs)
+    if signs is None:
+        ift = jnp.fft.fftshift(jnp.fft.ifftn(ft, axes=axes, **kwargs), axes=axes)
+    else:
+        ift = jnp.fft.ifftn(_multiply_by_signs(ft, signs), axes=axes, **kwargs)
 
     if real:
         return ift.real
@@ -92,7 +98,11 @@ def fftn(
     ft :
         Fourier transform of array.
     """
-    ft = jnp.fft.fftn(jnp.fft.ifftshift(ift, axes=axes), axes=axes, **kwargs)
+    signs = _get_shift_signs(ift.shape, axes, **kwargs)
+    if signs is None:
+        ft = jnp.fft.fftn(jnp.fft.ifftshift(ift, axes=axes), axes=axes, **kwargs)
+    else:
+        ft = _multiply_by_signs(jnp.fft.fftn(ift, axes=axes, **kwargs), signs)
 
     return ft
 
@@ -139,7 +149,17 @@ def irfftn(
     ift :
         Inverse fourier transform.
     """
-    ift = jnp.fft.fftshift(jnp.fft.irfftn(ft, s=s, axes=axes, **kwargs), axes=axes)
+    # ... the shape of the output along the last transformed axis
+    # is 2 * (m - 1) if `s` is not given
+    last_axis = -1 if axes is None else axes[-1]
+    shape = tuple(
+        2 * (n - 1) if i == last_axis % ft.ndim else n for i, n in enumerate(ft.shape)
+    )
+    signs = _get_shift_signs(shape, axes, half_space=True, s=s)
+    if signs is None:
+        ift = jnp.fft.fftshift(jnp.fft.irfftn(ft, s=s, axes=axes, **kwargs), axes=axes)
+    else:
+        ift = jnp.fft.irfftn(_multiply_by_signs(ft, signs), axes=axes, **kwargs)
 
     return ift
 
@@ -179,6 +199,54 @@ def rfftn(
     ft :
         Fourier transform of array.
     """
-    ft = jnp.fft.rfftn(jnp.fft.ifftshift(ift, axes=axes), axes=axes, **kwargs)
+    signs = _get_shift_signs(ift.shape, axes, half_space=True, **kwargs)
+    if signs is None:
+        ft = jnp.fft.rfftn(jnp.fft.ifftshift(ift, axes=axes), axes=axes, **kwargs)
+    else:
+        ft = _multiply_by_signs(jnp.fft.rfftn(ift, axes=axes, **kwargs), signs)
 
     return ft
+
+
+def _get_shift_signs(
+    shape: tuple[int, ...],
+    axes: Optional[tuple[int, ...]],
+    half_space: bool = False,
+    **kwargs: Any,
+) -> Optional[tuple[np.ndarray, ...]]:
+    # Along an axis of even size n, shifting an array by n // 2 in real space
+    # multiplies its fourier transform by (-1)^k, so the shift can be applied
+    # as an elementwise product in fourier space rather than as a copy. Return
+    # the signs along each axis, or `None` if they cannot be used. Here, `shape`
+    # is the shape in real space. If `half_space = True`, the signs are for
+    # the output of a real-valued FFT, so they only span the first n // 2 + 1
+    # frequencies along the last transformed axis
+    if kwargs.get("s") is not None:
+        return None
+    ndim = len(shape)
+    axes = tuple(range(ndim)) if axes is None else tuple(a % ndim for a in axes)
+    if any(shape[axis] % 2 == 1 for axis in axes):
+        return None
+    if half_space:
+        shape = tuple(n // 2 + 1 if i == axes[-1] else n for i, n in enumerate(shape))
+    return _get_checkerboard_signs(shape, axes)
+
+
+@lru_cache(maxsize=None)
+def _get_checkerboard_signs(
+    shape: tuple[int, ...], axes: tuple[int, ...]
+) -> tuple[np.ndarray, ...]:
+    # The factors of the checkerboard (-1)^(k_1 + ... + k_n) along each of
+    # `axes`, each broadcastable against an array of shape `shape`
+    return tuple(
+        np.where(np.arange(shape[axis]) % 2 == 0, 1, -1).reshape(
+            tuple(n if i == axis else 1 for i, n in enumerate(shape))
+        )
+        for axis in axes
+    )
+
+
+def _multiply_by_signs(array: Array, signs: tuple[np.ndarray, ...]) -> Array:
+    for sign in signs:
+        array = array * jnp.asarray(sign, dtype=array.real.dtype)
+    return array
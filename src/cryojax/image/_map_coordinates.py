@@ -6,20 +6,19 @@ This code was developed for the project [`dLux`](https://louisdesdoigts.github.i
 """
 
 import functools
-import itertools
 import operator
-from typing import List, Sequence, Tuple
+from typing import List, Sequence, Tuple, Union
 
 import jax
 import jax.numpy as jnp
-import lineax as lx
-from jax import lax, util, vmap
+import numpy as np
+from jax import lax
 from jaxtyping import Array, ArrayLike
 
 
 def map_coordinates(
     input: ArrayLike,
-    coordinates: Sequence[ArrayLike],
+    coordinates: Union[Sequence[ArrayLike], Array],
     order: int,
     mode: str = "fill",
     cval: ArrayLike = 0.0,
@@ -30,225 +29,359 @@ def map_coordinates(
     Adapted from Louis Desdoigts's [version of `jax.scipy.map_coordinates`](https://github.com/LouisDesdoigts/jax/blob/cubic-spline-updated/jax/_src/scipy/ndimage.py),
     which was developed for the project [`dLux`](https://louisdesdoigts.github.io/dLux/).
 
+    For `order = 3`, the spline coefficients of `input` are solved for on
+    every call. When interpolating the same `input` many times, instead
+    compute them once with `compute_spline_coefficients` and pass them to
+    `map_coordinates_with_cubic_spline`.
+
     Arguments
     ---------
+    coordinates :
+        The coordinates at which to interpolate, either as a sequence with
+        one array per axis or stacked into a single array of shape
+        `(ndim, ...)`.
+    order :
+        The order of interpolation. Supports nearest neighbor (`order = 0`),
+        linear (`order = 1`), and cubic spline (`order = 3`) interpolation.
     mode :
-        Uses built-in JAX out-of-bounds indexing to determine how to
-        extrapolate beyond boundaries.
+        How to extrapolate beyond boundaries. If `mode = "fill"`, each
+        interpolation node that is out of bounds takes the value `cval`.
+        This includes nodes at negative indices, which do not wrap around
+        as they would in numpy indexing. Other modes use built-in JAX
+        out-of-bounds indexing.
         See https://jax.readthedocs.io/en/latest/_autosummary/jax.numpy.ndarray.at.html.
+    cval :
+        The value of out-of-bounds interpolation nodes if `mode = "fill"`.
     """
-    if order in [0, 1]:
-        return _map_coordinates_nn_or_linear(input, coordinates, order, mode, cval)
-    elif order == 3:
-        coefficients = compute_spline_coefficients(input)
-        return _map_coordinates_with_cubic_spline(coefficients, coordinates, mode, cval)
-    else:
+    try:
+        map_coordinates_fn = _map_coordinates_by_order[order]
+    except KeyError:
         raise NotImplementedError(f"map_coordinates does not support order={order}.")
+    return map_coordinates_fn(input, coordinates, mode, cval)
 
 
 def map_coordinates_with_cubic_spline(
     coefficients: ArrayLike,
-    coordinates: Sequence[ArrayLike],
+    coordinates: Union[Sequence[ArrayLike], Array],
     mode: str = "fill",
     cval: ArrayLike = 0.0,
 ):
     """
     Similar to scipy.map_coordinates, but takes cubic spline coefficients as input.
+    These are computed with `compute_spline_coefficients`, so that they can be
+    reused across calls that interpolate the same array.
 
     Adapted from https://github.com/LouisDesdoigts/jax/blob/cubic-spline-updated/jax/_src/scipy/ndimage.py,
     which was developed for the project [dLux](https://louisdesdoigts.github.io/dLux/).
 
     Arguments
     ---------
+    coordinates :
+        The coordinates at which to interpolate, either as a sequence with
+        one array per axis or stacked into a single array of shape
+        `(ndim, ...)`.
     mode :
-        Uses built-in JAX out-of-bounds indexing to determine how to
-        extrapolate beyond boundaries.
+        How to extrapolate beyond boundaries. If `mode = "fill"`, each
+        interpolation node that is out of bounds takes the value `cval`.
+        This includes nodes at negative indices, which do not wrap around
+        as they would in numpy indexing. Other modes use built-in JAX
+        out-of-bounds indexing.
         See https://jax.readthedocs.io/en/latest/_autosummary/jax.numpy.ndarray.at.html.
-
+    cval :
+        The value of out-of-bounds interpolation nodes if `mode = "fill"`.
     """
     return _map_coordinates_with_cubic_spline(coefficients, coordinates, mode, cval)
 
 
 @jax.jit
 def compute_spline_coefficients(data: Array) -> Array:
-    """Solve for the spline coefficients of an input array."""
+    """Solve for the spline coefficients of an input array.
+
+    This is compiled once for each shape and dtype of `data`. When the same
+    array is interpolated repeatedly, call this once outside of the loop and
+    pass the result to `map_coordinates_with_cubic_spline`, rather than
+    calling `map_coordinates` with `order = 3` inside of it.
+    """
+    if any(n < 3 for n in data.shape):
+        raise ValueError(
+            "Cubic spline coefficients require at least 3 points along each "
+            f"axis, but got an array of shape {data.shape}."
+        )
     ndim = data.ndim
     for i in range(ndim):
         axis = ndim - i - 1
-        A = _build_operator(data.shape[axis] - 2, dtype=data.dtype)
-        fn = lambda x: _solve_coefficients(x, A)
-        for j in range(ndim - 2, -1, -1):
-            ax = int(j >= axis)
-            fn = vmap(fn, ax, ax)
-        data = fn(data)
+        # Solve for the coefficients along all 1D lines of this axis at once
+        data = jnp.moveaxis(_solve_coefficients(jnp.moveaxis(data, axis, 0)), 0, axis)
     return data
 
 
-@functools.partial(jax.jit, static_argnums=(2, 3, 4))
-def _map_coordinates_nn_or_linear(
+@functools.partial(jax.jit, static_argnums=(2, 3))
+def _map_coordinates_nearest(
     input: ArrayLike,
-    coordinates: Sequence[ArrayLike],
-    order: int,
+    coordinates: Union[Sequence[ArrayLike], Array],
     mode: str,
     cval: ArrayLike,
 ) -> Array:
     input_arr = jnp.asarray(input)
-    coordinate_arrs = [jnp.asarray(c) for c in coordinates]
+    coordinate_arrs = _as_coordinate_arrays(coordinates, input_arr.ndim, "input")
+    # Nearest neighbor interpolation is a single gather, with no weights
+    indices = [
+        _round_half_away_from_zero(coordinate).astype(jnp.int32)
+        for coordinate in coordinate_arrs
+    ]
+    return _gather(input_arr, indices, mode, cval)
 
-    if len(coordinates) != input_arr.ndim:
-        raise ValueError(
-            "coordinates must be a sequence of length input.ndim, but "
-            "{} != {}".format(len(coordinates), input_arr.ndim)
-        )
 
-    if order == 0:
-        interp_fun = _nearest_indices_and_weights
-    elif order == 1:
-        interp_fun = _linear_indices_and_weights
-    else:
-        raise NotImplementedError(
-            "_map_coordinates_nn_or_linear requires order = 0 or 1."
+@functools.partial(jax.jit, static_argnums=(2, 3))
+def _map_coordinates_linear(
+    input: ArrayLike,
+    coordinates: Union[Sequence[ArrayLike], Array],
+    mode: str,
+    cval: ArrayLike,
+) -> Array:
+    input_arr = jnp.asarray(input)
+    coordinate_arrs = _as_coordinate_arrays(coordinates, input_arr.ndim, "input")
+    ndim = input_arr.ndim
+    batch_ndim = max(c.ndim for c in coordinate_arrs)
+    indices, weights = [], []
+    for axis, coordinate in enumerate(coordinate_arrs):
+        # Stack the two interpolation nodes along this axis into arrays of shape
+        # (*coordinate.shape, 1, ..., 2, ..., 1), so that all nodes of the
+        # stencil broadcast against each other in a single gather. As in
+        # `_spline_points`, the coordinate dimensions are padded on the left
+        # so that coordinates of different shapes broadcast against each other
+        lower = jnp.floor(coordinate)
+        upper_weight = coordinate - lower
+        stencil_shape = (
+            (1,) * (batch_ndim - coordinate.ndim)
+            + tuple(coordinate.shape)
+            + _stencil_axis_shape(ndim, axis, 2)
         )
-
-    interpolations_1d = []
-    for coordinate in coordinate_arrs:
-        interp_nodes = interp_fun(coordinate)
-        interpolations_1d.append(interp_nodes)
-    outputs = []
-    for items in itertools.product(*interpolations_1d):
-        indices, weights = util.unzip2(items)
-        contribution = input_arr.at[indices].get(mode=mode, fill_value=cval)
-        interpolated = _nonempty_prod(weights) * contribution
-        outputs.append(interpolated)
-    result = _nonempty_sum(outputs)
+        index = lower.astype(jnp.int32)
+        indices.append(jnp.stack([index, index + 1], axis=-1).reshape(stencil_shape))
+        weights.append(
+            jnp.stack([1 - upper_weight, upper_weight], axis=-1).reshape(stencil_shape)
+        )
+    contribution = _gather(input_arr, indices, mode, cval)
+    result = jnp.sum(
+        _nonempty_prod(weights) * contribution, axis=tuple(range(-ndim, 0))
+    )
     if jnp.issubdtype(input_arr.dtype, jnp.integer):
         result = _round_half_away_from_zero(result)
     return result.astype(input_arr.dtype)
 
 
+@functools.partial(jax.jit, static_argnums=(2, 3))
+def _map_coordinates_cubic(
+    input: ArrayLike,
+    coordinates: Union[Sequence[ArrayLike], Array],
+    mode: str,
+    cval: ArrayLike,
+) -> Array:
+    coefficients = compute_spline_coefficients(jnp.asarray(input))
+    return _map_coordinates_with_cubic_spline(coefficients, coordinates, mode, cval)
+
+
 @functools.partial(jax.jit, static_argnums=(2, 3))
 def _map_coordinates_with_cubic_spline(
     coefficients: ArrayLike,
-    coordinates: Sequence[ArrayLike],
+    coordinates: Union[Sequence[ArrayLike], Array],
     mode: str,
     cval: ArrayLike,
 ) -> Array:
     coefficients = jnp.asarray(coefficients)
-    if len(coordinates) != coefficients.ndim:
+    coordinate_arrs = _as_coordinate_arrays(
+        coordinates, coefficients.ndim, "coefficients"
+    )
+    return _spline_points(coefficients, coordinate_arrs, mode, cval)
+
+
+# Each interpolation order is a separately jitted function, so that `order`
+# is resolved once in python rather than inside the traced body
+_map_coordinates_by_order = {
+    0: _map_coordinates_nearest,
+    1: _map_coordinates_linear,
+    3: _map_coordinates_cubic,
+}
+
+
+def _as_coordinate_arrays(
+    coordinates: Union[Sequence[ArrayLike], Array], ndim: int, name: str
+) -> List[Array]:
+    if len(coordinates) != ndim:
         raise ValueError(
-            "coordinates must be a sequence of length coefficients.ndim, but "
-            "{} != {}".format(len(coordinates), coefficients.ndim)
+            f"coordinates must be a sequence of length {name}.ndim, but "
+            f"{len(coordinates)} != {ndim}"
         )
-    # Stack coordinates along one axis
-    coords = jnp.stack([jnp.asarray(c) for c in coordinates], axis=0)
-    # vmap spline evaluate over coordinates and return
-    fn = lambda coord: _spline_point(coefficients, coord, mode, cval)
-    return vmap(fn)(coords.reshape(coefficients.ndim, -1).T).reshape(coords.shape[1:])
+    if isinstance(coordinates, jax.Array):
+        # Coordinates stacked into one array of shape (ndim, ...) are
+        # already a jax array, so just unstack them along the first axis
+        return list(coordinates)
+    else:
+        return [jnp.asarray(coordinate) for coordinate in coordinates]
 
 
 #
 # Nearest neighbor and linear interpolation utilities
 #
 def _nonempty_prod(arrs: Sequence[Array]) -> Array:
+    # The per-axis weights have different, broadcastable shapes, so stacking
+    # them for a single reduction would first materialize each at the full
+    # stencil shape. A chain of elementwise multiplies fuses into one loop.
     return functools.reduce(operator.mul, arrs)
 
 
-def _nonempty_sum(arrs: Sequence[Array]) -> Array:
-    return functools.reduce(operator.add, arrs)
-
+def _stencil_axis_shape(ndim: int, axis: int, n_nodes: int) -> Tuple[int, ...]:
+    # The shape (1, ..., n_nodes, ..., 1) that places the interpolation
+    # nodes of `axis` along their own dimension of the stencil
+    return tuple(n_nodes if i == axis else 1 for i in range(ndim))
 
-def _round_half_away_from_zero(a: Array) -> Array:
-    return a if jnp.issubdtype(a.dtype, jnp.integer) else lax.round(a)
 
-
-def _nearest_indices_and_weights(
-    coordinate: Array,
-) -> List[Tuple[Array, ArrayLike]]:
-    index = _round_half_away_from_zero(coordinate).astype(jnp.int32)
-    weight = coordinate.dtype.type(1)
-    return [(index, weight)]
+def _gather(
+    array: Array, indices: Sequence[Array], mode: str, cval: ArrayLike
+) -> Array:
+    if mode == "fill":
+        # Gathering with mode="fill" masks every gathered element. Instead, pad
+        # the array by one element of `cval` on each side and clip the indices
+        # onto the padding, which gives the same result without the masking
+        padded_array = jnp.pad(array, 1, constant_values=cval)
+        padded_indices = tuple(
+            jnp.clip(index + 1, 0, n_padded - 1)
+            for index, n_padded in zip(indices, padded_array.shape)
+        )
+        return padded_array.at[padded_indices].get(mode="promise_in_bounds")
+    else:
+        return array.at[tuple(indices)].get(mode=mode, fill_value=cval)
 
 
-def _linear_indices_and_weights(
-    coordinate: Array,
-) -> List[Tuple[Array, ArrayLike]]:
-    lower = jnp.floor(coordinate)
-    upper_weight = coordinate - lower
-    lower_weight = 1 - upper_weight
-    index = lower.astype(jnp.int32)
-    return [(index, lower_weight), (index + 1, upper_weight)]
+def _round_half_away_from_zero(a: Array) -> Array:
+    return a if jnp.issubdtype(a.dtype, jnp.integer) else lax.round(a)
 
 
 #
 # Spline interpolation utilities
 #
-def _build_operator(
-    n: int, dtype: jnp.dtype | None = None, diag_value: float = 4.0
-) -> lx.TridiagonalLinearOperator:
-    diagonal = jnp.full((n,), diag_value, dtype=dtype)
-    lower_diagonal = jnp.full((n - 1,), 1.0, dtype=dtype)
-    upper_diagonal = jnp.full((n - 1,), 1.0, dtype=dtype)
-    return lx.TridiagonalLinearOperator(diagonal, lower_diagonal, upper_diagonal)
-
-
 def _construct_vector(data: Array, c2: Array, cnp2: Array) -> Array:
-    yvec = data[1:-1]
+    # The system has size n - 2. If n = 3, its single entry is constrained
+    # by both boundaries
+    if data.shape[0] == 3:
+        return (data[1] - c2 - cnp2)[None]
     first = data[1] - c2
     last = data[-2] - cnp2
-    yvec = yvec.at[0].set(first)
-    yvec = yvec.at[-1].set(last)
-    return yvec
+    return jnp.concatenate([first[None], data[2:-2], last[None]])
 
 
-def _solve_coefficients(
-    data: Array, operator: lx.TridiagonalLinearOperator, h=1
-) -> Array:
+def _solve_coefficients(data: Array, h=1) -> Array:
+    # Solve for coefficients along the first axis, batching over the rest.
     # Calcualte second and second last coefficients
     c2 = 1 / 6 * data[0]
     cnp2 = 1 / 6 * data[-1]
 
     # Solve for internal cofficients
     yvec = _construct_vector(data, c2, cnp2)
-    solution = lx.linear_solve(operator, yvec)
-    cs = solution.value
+    cs = _solve_tridiagonal_system(yvec)
 
     # Calculate first and last coefficients
     c1 = 2 * c2 - cs[0]
     cnp3 = 2 * cnp2 - cs[-1]
-    return jnp.concatenate([jnp.array([c1, c2]), cs, jnp.array([cnp2, cnp3])])
-
-
-def _spline_basis(t: Array) -> Array:
-    at = jnp.abs(t)
-    fn1 = lambda t: (2 - t) ** 3
-    fn2 = lambda t: 4 - 6 * t**2 + 3 * t**3
-    return jnp.where(
-        at >= 1,
-        jnp.where(at <= 2, fn1(at), 0),
-        jnp.where(at <= 1, fn2(at), 0),  # type: ignore
-    )
-
-
-def _spline_value(
-    coefficients: Array,
-    coordinate: Array,
-    index: Array,
-    mode: str,
-    cval: ArrayLike,
-) -> Array:
-    coefficient = coefficients.at[tuple(index)].get(mode=mode, fill_value=cval)
-    fn = vmap(lambda x, i: _spline_basis(x - i + 1), (0, 0))
-    return coefficient * fn(coordinate, index).prod()
-
-
-def _spline_point(
+    return jnp.concatenate([c1[None], c2[None], cs, cnp2[None], cnp3[None]])
+
+
+def _solve_tridiagonal_system(yvec: Array, diag_value: float = 4.0) -> Array:
+    # Solve the symmetric tridiagonal system with constant diagonal `diag_value`
+    # and off-diagonals equal to one along the first axis, batching over the
+    # rest. The Thomas algorithm multipliers of this system do not depend on
+    # the data, so they are precomputed. Each sweep is then a first-order
+    # affine recurrence x_i = a_i * x_{i-1} + b_i
+    scale = jnp.asarray(
+        _thomas_multipliers(yvec.shape[0], diag_value), dtype=yvec.real.dtype
+    ).reshape((-1,) + (1,) * (yvec.ndim - 1))
+    # ... forward sweep, d_i = (y_i - d_{i-1}) * s_i
+    d = _solve_affine_recurrence(-scale, scale * yvec)
+    # ... backward sweep, x_i = d_i - s_i * x_{i+1}
+    x = _solve_affine_recurrence(-scale, d, reverse=True)
+    return x
+
+
+def _solve_affine_recurrence(a: Array, b: Array, reverse: bool = False) -> Array:
+    # Evaluate x_i = a_i * x_{i-1} + b_i along the first axis, starting from zero.
+    # On CPU, a sequential loop over the axis is fastest, as it does O(n) work
+    # in place. On accelerators, an associative scan evaluates the recurrence
+    # in logarithmic depth, at the cost of more total work
+    if jax.default_backend() == "cpu":
+
+        def step(x, ab):
+            a_i, b_i = ab
+            x = a_i * x + b_i
+            return x, x
+
+        _, x = jax.lax.scan(step, jnp.zeros_like(b[0]), (a, b), reverse=reverse)
+    else:
+        _, x = jax.lax.associative_scan(_compose_affine_maps, (a, b), reverse=reverse)
+    return x
+
+
+def _compose_affine_maps(
+    map_1: tuple[Array, Array], map_2: tuple[Array, Array]
+) -> tuple[Array, Array]:
+    # Compose x -> a_1 * x + b_1 followed by x -> a_2 * x + b_2
+    a_1, b_1 = map_1
+    a_2, b_2 = map_2
+    return a_2 * a_1, a_2 * b_1 + b_2
+
+
+@functools.lru_cache(maxsize=None)
+def _thomas_multipliers(n: int, diag_value: float) -> np.ndarray:
+    # The multipliers converge geometrically to `2 - sqrt(3)` for
+    # `diag_value = 4`, but are computed exactly for finite `n`
+    scale = np.empty((n,))
+    scale[0] = 1.0 / diag_value
+    for i in range(1, n):
+        scale[i] = 1.0 / (diag_value - scale[i - 1])
+    return scale
+
+
+def _spline_weights(fraction: Array) -> Array:
+    # The cubic B-spline basis evaluated at the four nodes surrounding each
+    # point, given its fractional offset `f` from the second node. The nodes
+    # are at distances 1 + f, f, 1 - f, and 2 - f, where the basis is
+    # (2 - t)^3 for 1 <= t <= 2 and 4 - 6t^2 + 3t^3 for t <= 1
+    f = fraction
+    g = 1 - fraction
+    f2, g2 = f * f, g * g
+    f3, g3 = f2 * f, g2 * g
+    return jnp.stack([g3, 4 - 6 * f2 + 3 * f3, 4 - 6 * g2 + 3 * g3, f3], axis=-1)
+
+
+def _spline_points(
     coefficients: Array,
-    coordinate: Array,
+    coordinates: Sequence[Array],
     mode: str,
     cval: ArrayLike,
 ) -> Array:
-    index_fn = lambda x: (jnp.arange(0, 4) + jnp.floor(x)).astype(int)
-    index_vals = vmap(index_fn)(coordinate)
-    indices = jnp.array(jnp.meshgrid(*index_vals, indexing="ij"))
-    fn = lambda index: _spline_value(coefficients, coordinate, index, mode, cval)
-    return vmap(fn)(indices.reshape(coefficients.ndim, -1).T).sum()
+    # The spline is a tensor product of 1D basis functions, so evaluate
+    # the basis at the four nearest nodes of each axis and take the
+    # outer product, rather than evaluating it at all 4^d nodes. This is
+    # done for all query points at once in a single gather. As with
+    # `jnp.ix_`, the index and weight arrays of each axis only span that
+    # axis's four nodes, with shape (*coordinate.shape, 1, ..., 4, ..., 1),
+    # and are broadcast against each other rather than materialized
+    # at all 4^d nodes.
+    ndim = coefficients.ndim
+    batch_ndim = max(c.ndim for c in coordinates)
+    indices, weights = [], []
+    for axis, coordinate in enumerate(coordinates):
+        # Convert the lower node to an integer once, and evaluate the basis
+        # at each of the four nodes from the fractional offset
+        lower = jnp.floor(coordinate)
+        index = lower.astype(jnp.int32)[..., None] + jnp.arange(4, dtype=jnp.int32)
+        weight = _spline_weights(coordinate - lower)
+        stencil_shape = (
+            (1,) * (batch_ndim - coordinate.ndim)
+            + tuple(coordinate.shape)
+            + _stencil_axis_shape(ndim, axis, 4)
+        )
+        indices.append(index.reshape(stencil_shape))
+        weights.append(weight.reshape(stencil_shape))
+    coefficient = _gather(coefficients, indices, mode, cval)
+    return jnp.sum(_nonempty_prod(weights) * coefficient, axis=tuple(range(-ndim, 0)))
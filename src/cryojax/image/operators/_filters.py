@@ -21,6 +21,9 @@ from ._operator import AbstractImageMultiplier
 class AbstractFilter(AbstractImageMultiplier, strict=True):
     """
     Base class for computing and applying an image filter.
+
+    The filter is computed once, at construction, and stored in
+    `buffer`. Applying it is a single elementwise multiplication.
     """
 
     @overload
@@ -4,6 +4,7 @@ Using the fourier slice theorem for computing volume projections.
 
 from typing import Any
 
+import jax
 import jax.numpy as jnp
 from equinox import field
 from jaxtyping import Array, Complex, Float
@@ -127,10 +128,11 @@ def extract_slice(
     # Convert to logical coordinates
     N = frequency_slice.shape[1]
     logical_frequency_slice = (frequency_slice * N) + N // 2
-    # Convert arguments to map_coordinates convention and compute
-    k_z, k_y, k_x = jnp.transpose(logical_frequency_slice, axes=[3, 0, 1, 2])
+    # Convert arguments to map_coordinates convention, stacked as (k_x, k_y, k_z),
+    # and compute
+    coordinates = jnp.transpose(logical_frequency_slice, axes=[3, 0, 1, 2])[::-1]
     projection = map_coordinates(
-        fourier_voxel_grid, (k_x, k_y, k_z), interpolation_order, **kwargs
+        fourier_voxel_grid, coordinates, interpolation_order, **kwargs
     )[0, :, :]
     # Shift zero frequency component to corner and take upper half plane
     projection = jnp.fft.ifftshift(projection)[:, : N // 2 + 1]
@@ -141,7 +143,9 @@ def extract_slice(
 
 
 def extract_slice_with_cubic_spline(
-    spline_coefficients: Complex[Array, "dim+2 dim+2 dim+2"],
+    spline_coefficients: (
+        Complex[Array, "dim+2 dim+2 dim+2"] | Float[Array, "2 dim+2 dim+2 dim+2"]
+    ),
     frequency_slice: Float[Array, "1 dim dim 3"],
     **kwargs: Any,
 ) -> Complex[Array, "dim dim//2+1"]:
@@ -152,8 +156,10 @@ def extract_slice_with_cubic_spline(
 
     Arguments
     ---------
-    spline_coefficients : shape `(N+2, N+2, N+2)`
-        Coefficients for cubic spline.
+    spline_coefficients : shape `(N+2, N+2, N+2)` or `(2, N+2, N+2, N+2)`
+        Coefficients for cubic spline. Alternatively, the real and
+        imaginary parts of the coefficients stacked along a leading axis,
+        for example in reduced precision.
     frequency_slice : shape `(1, N, N, 3)`
         Frequency central slice coordinate system, with the zero
         frequency component in the corner.
@@ -168,11 +174,26 @@ def extract_slice_with_cubic_spline(
     # Convert to logical coordinates
     N = frequency_slice.shape[1]
     logical_frequency_slice = (frequency_slice * N) + N // 2
-    # Convert arguments to map_coordinates convention and compute
-    k_z, k_y, k_x = jnp.transpose(logical_frequency_slice, axes=[3, 0, 1, 2])
-    projection = map_coordinates_with_cubic_spline(
-        spline_coefficients, (k_x, k_y, k_z), **kwargs
-    )[0, :, :]
+    # Convert arguments to map_coordinates convention, stacked as (k_x, k_y, k_z),
+    # and compute
+    coordinates = jnp.transpose(logical_frequency_slice, axes=[3, 0, 1, 2])[::-1]
+    if spline_coefficients.ndim == 3:
+        projection = map_coordinates_with_cubic_spline(
+            spline_coefficients, coordinates, **kwargs
+        )[0, :, :]
+    else:
+        # ... interpolate the stacked real and imaginary parts separately. These
+        # are upcast to the dtype of the coordinates as they are gathered
+        cval = complex(kwargs.pop("cval", 0.0))
+        real_projection, imag_projection = (
+            map_coordinates_with_cubic_spline(
+                coefficients, coordinates, cval=part_of_cval, **kwargs
+            )[0, :, :]
+            for coefficients, part_of_cval in zip(
+                spline_coefficients, (cval.real, cval.imag)
+            )
+        )
+        projection = jax.lax.complex(real_projection, imag_projection)
     # Shift zero frequency component to corner and take upper half plane
     projection = jnp.fft.ifftshift(projection)[:, : N // 2 + 1]
     # Set last line of frequencies to zero if image dimension is even
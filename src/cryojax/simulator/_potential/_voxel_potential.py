@@ -3,7 +3,7 @@ Voxel-based representations of the scattering potential.
 """
 
 from abc import abstractmethod
-from functools import cached_property
+from functools import cached_property, partial
 from typing import (
     Any,
     cast,
@@ -18,6 +18,7 @@ import jax
 import jax.numpy as jnp
 import numpy as np
 from equinox import AbstractClassVar, AbstractVar, field
+from jax.typing import DTypeLike
 from jaxtyping import Array, Complex, Float, Int
 
 from ...constants import get_form_factor_params
@@ -114,6 +115,7 @@ class AbstractFourierVoxelGridPotential(AbstractVoxelPotential, strict=True):
         *,
         pad_scale: float = 1.0,
         pad_mode: str = "constant",
+        fft_friendly_padding: bool = False,
         filter: Optional[AbstractFilter] = None,
     ) -> Self:
         """Load an `AbstractFourierVoxelGridPotential` from real-valued 3D electron
@@ -124,42 +126,41 @@ class AbstractFourierVoxelGridPotential(AbstractVoxelPotential, strict=True):
         - `real_voxel_grid`: A scattering potential voxel grid in real space.
         - `voxel_size`: The voxel size of `real_voxel_grid`.
         - `pad_scale`: Scale factor at which to pad `real_voxel_grid` before fourier
-                     transform. Must be a value greater than `1.0`.
+                     transform. Must be a value greater than `1.0`. Each
+                     dimension `s` is padded to `int(s * pad_scale)`.
         - `pad_mode`: Padding method. See `jax.numpy.pad` for documentation.
+        - `fft_friendly_padding`: If `True`, round each padded dimension up to
+                                the next even size whose prime factors are at
+                                most `7`, for which the fourier transform is
+                                fast. For example, `126` is unchanged and `130`
+                                is rounded up to `140`.
         - `filter`: A filter to apply to the result of the fourier transform of
                   `real_voxel_grid`, i.e. `fftn(real_voxel_grid)`. Note that the zero
-                  frequency component is assumed to be in the corner.
+                  frequency component is assumed to be in the corner. Its shape
+                  must match the padded shape, including any rounding from
+                  `fft_friendly_padding`.
         """
-        # Cast to jax array
-        real_voxel_grid, voxel_size = (
-            jnp.asarray(real_voxel_grid),
-            jnp.asarray(voxel_size),
-        )
         # Pad template
         if pad_scale < 1.0:
             raise ValueError("pad_scale must be greater than 1.0")
-        # ... always pad to even size to avoid interpolation issues in
-        # fourier slice extraction.
         padded_shape = cast(
             tuple[int, int, int],
             tuple([int(s * pad_scale) for s in real_voxel_grid.shape]),
         )
-        padded_real_voxel_grid = pad_to_shape(
-            real_voxel_grid, padded_shape, mode=pad_mode
-        )
-        # Load potential and coordinates. For now, do not store the
-        # fourier potential only on the half space. Fourier slice extraction
-        # does not currently work if rfftn is used.
-        fourier_voxel_grid_with_zero_in_corner = (
-            fftn(padded_real_voxel_grid)
-            if filter is None
-            else filter(fftn(padded_real_voxel_grid))
+        if fft_friendly_padding:
+            # ... round up to an even size that the FFT handles efficiently.
+            # Even sizes avoid interpolation issues in fourier slice extraction
+            padded_shape = cast(
+                tuple[int, int, int],
+                tuple([_next_even_smooth_size(s) for s in padded_shape]),
+            )
+        # Load potential and coordinates
+        fourier_voxel_grid = _compute_fourier_voxel_grid(
+            real_voxel_grid, padded_shape, pad_mode, filter
         )
-        # ... store the potential grid with the zero frequency component in the center
-        fourier_voxel_grid = jnp.fft.fftshift(fourier_voxel_grid_with_zero_in_corner)
         # ... create in-plane frequency slice on the half space
         frequency_slice = FrequencySlice(
-            cast(tuple[int, int], padded_real_voxel_grid.shape[:-1]), half_space=False
+            cast(tuple[int, int], padded_shape[:-1]), half_space=False
         )
 
         return cls(fourier_voxel_grid, frequency_slice, voxel_size)
@@ -242,7 +243,10 @@ class FourierVoxelGridPotentialInterpolator(AbstractFourierVoxelGridPotential):
     by spline coefficients.
     """
 
-    coefficients: Float[Array, "coeff_dim coeff_dim coeff_dim"]
+    coefficients: (
+        Complex[Array, "coeff_dim coeff_dim coeff_dim"]
+        | Float[Array, "2 coeff_dim coeff_dim coeff_dim"]
+    )
     wrapped_frequency_slice_in_pixels: FrequencySlice
     voxel_size: Float[Array, ""] = field(converter=error_if_not_positive)
 
@@ -250,9 +254,15 @@ class FourierVoxelGridPotentialInterpolator(AbstractFourierVoxelGridPotential):
 
     def __init__(
         self,
-        fourier_voxel_grid: Float[Array, "dim dim dim"],
+        fourier_voxel_grid: Optional[Complex[Array, "dim dim dim"]],
         wrapped_frequency_slice_in_pixels: FrequencySlice,
         voxel_size: Float[Array, ""] | float,
+        *,
+        coefficients: Optional[
+            Complex[Array, "coeff_dim coeff_dim coeff_dim"]
+            | Float[Array, "2 coeff_dim coeff_dim coeff_dim"]
+        ] = None,
+        coefficient_dtype: Optional[DTypeLike] = None,
     ):
         """
         !!! note
@@ -270,19 +280,75 @@ class FourierVoxelGridPotentialInterpolator(AbstractFourierVoxelGridPotential):
 
         **Arguments:**
 
-        - `fourier_voxel_grid`: The cubic voxel grid in fourier space.
+        - `fourier_voxel_grid`: The cubic voxel grid in fourier space. This
+                                must be `None` if `coefficients` is given.
         - `wrapped_frequency_slice_in_pixels`: Frequency slice coordinate system,
                                                wrapped in a `FrequencySlice` object.
         - `voxel_size`: The voxel size.
+        - `coefficients`: Spline coefficients of the cubic voxel grid in fourier
+                          space that have already been computed, or their real
+                          and imaginary parts stacked along a leading axis. If
+                          given, the coefficients are not solved for.
+        - `coefficient_dtype`: If given, a real floating point dtype, such as
+                               `jnp.bfloat16`, in which to store the spline
+                               coefficients. The real and imaginary parts are
+                               stacked along a leading axis, since there is no
+                               complex counterpart of these dtypes. This trades
+                               precision for memory and bandwidth during slice
+                               extraction, where the coefficients are upcast
+                               as they are read.
         """
-        self.coefficients = compute_spline_coefficients(jnp.asarray(fourier_voxel_grid))
+        if (fourier_voxel_grid is None) == (coefficients is None):
+            raise ValueError(
+                "Exactly one of `fourier_voxel_grid` and `coefficients` must be given."
+            )
+        if coefficients is None:
+            coefficients = compute_spline_coefficients(jnp.asarray(fourier_voxel_grid))
+        else:
+            coefficients = jnp.asarray(coefficients)
+        if coefficient_dtype is not None:
+            if jnp.iscomplexobj(coefficients):
+                coefficients = jnp.stack((coefficients.real, coefficients.imag))
+            coefficients = coefficients.astype(coefficient_dtype)
+        self.coefficients = coefficients
         self.wrapped_frequency_slice_in_pixels = wrapped_frequency_slice_in_pixels
         self.voxel_size = jnp.asarray(voxel_size)
 
+    @classmethod
+    def from_coefficients(
+        cls,
+        coefficients: (
+            Complex[Array, "coeff_dim coeff_dim coeff_dim"]
+            | Float[Array, "2 coeff_dim coeff_dim coeff_dim"]
+        ),
+        wrapped_frequency_slice_in_pixels: FrequencySlice,
+        voxel_size: Float[Array, ""] | float,
+    ) -> Self:
+        """Load a `FourierVoxelGridPotentialInterpolator` from spline coefficients
+        that have already been computed, for example with
+        `cryojax.image.compute_spline_coefficients`. This does not solve for the
+        coefficients, so it is cheap to call repeatedly.
+
+        **Arguments:**
+
+        - `coefficients`: The spline coefficients of the cubic voxel grid
+                          in fourier space, or their real and imaginary parts
+                          stacked along a leading axis.
+        - `wrapped_frequency_slice_in_pixels`: Frequency slice coordinate system,
+                                               wrapped in a `FrequencySlice` object.
+        - `voxel_size`: The voxel size.
+        """
+        return cls(
+            None,
+            wrapped_frequency_slice_in_pixels,
+            voxel_size,
+            coefficients=coefficients,
+        )
+
     @property
     def shape(self) -> tuple[int, int, int]:
         return cast(
-            tuple[int, int, int], tuple([s - 2 for s in self.coefficients.shape])
+            tuple[int, int, int], tuple([s - 2 for s in self.coefficients.shape[-3:]])
         )
 
 
@@ -303,7 +369,7 @@ class RealVoxelGridPotential(AbstractVoxelPotential, strict=True):
     ):
         """**Arguments:**
 
-        - `real_voxel_grid`: The voxel grid in fourier space.
+        - `real_voxel_grid`: The voxel grid in real space.
         - `wrapped_coordinate_grid_in_pixels`: A coordinate grid, wrapped into a
                                                `CoordinateGrid` object.
         - `voxel_size`: The voxel size.
@@ -365,15 +431,16 @@ class RealVoxelGridPotential(AbstractVoxelPotential, strict=True):
         **Arguments:**
 
         - `real_voxel_grid`: An electron scattering potential voxel grid in real space.
+                             This is indexed in (z, y, x) order, the same as the
+                             `CoordinateGrid` whose last axis holds the (x, y, z)
+                             coordinates of each voxel. So it is stored as is,
+                             without a copy to permute its axes.
         - `voxel_size`: The voxel size of `real_voxel_grid`.
         - `crop_scale`: Scale factor at which to crop `real_voxel_grid`.
                       Must be a value less than `1.0`.
         """
-        # Cast to jax array
-        real_voxel_grid, voxel_size = (
-            jnp.asarray(real_voxel_grid),
-            jnp.asarray(voxel_size),
-        )
+        # Cast to jax array. The voxel size is cast upon construction
+        real_voxel_grid = jnp.asarray(real_voxel_grid)
         # Make coordinates if not given
         if coordinate_grid_in_pixels is None:
             # Option for cropping template
@@ -491,6 +558,7 @@ class RealVoxelCloudPotential(AbstractVoxelPotential, strict=True):
         coordinate_grid_in_pixels: Optional[CoordinateGrid] = None,
         rtol: float = 1e-05,
         atol: float = 1e-08,
+        size: Optional[int] = None,
     ) -> Self:
         """Load an `RealVoxelCloudPotential` from a real-valued 3D electron
         scattering potential voxel grid.
@@ -499,24 +567,34 @@ class RealVoxelCloudPotential(AbstractVoxelPotential, strict=True):
 
         - `real_voxel_grid`: An electron scattering potential voxel grid in real space.
         - `voxel_size`: The voxel size of `real_voxel_grid`.
-        - `rtol`: Argument passed to `jnp.isclose`, used for removing
-                points of zero scattering potential.
-        - `atol`: Argument passed to `jnp.isclose`, used for removing
-                points of zero scattering potential.
+        - `rtol`: Kept for compatibility with `jnp.isclose`. Points are compared
+                against zero, so the relative tolerance has no effect.
+        - `atol`: Points of absolute scattering potential at most `atol`
+                are removed.
+        - `size`: If given, the number of points to store. This makes the
+                number of points static, so that this method is jittable.
+                If there are fewer than `size` points of nonzero scattering
+                potential, the rest are stored with zero potential. If there are
+                more, only the first `size` points are kept.
         """
-        # Cast to jax array
-        real_voxel_grid, voxel_size = (
-            jnp.asarray(real_voxel_grid),
-            jnp.asarray(voxel_size),
-        )
+        # Cast to jax array. The voxel size is cast upon construction
+        real_voxel_grid = jnp.asarray(real_voxel_grid)
         # Make coordinates if not given
         if coordinate_grid_in_pixels is None:
             coordinate_grid_in_pixels = CoordinateGrid(real_voxel_grid.shape)
         # ... mask zeros to store smaller arrays. This
-        # option is not jittable.
-        nonzero = jnp.where(~jnp.isclose(real_voxel_grid, 0.0, rtol=rtol, atol=atol))
-        flat_potential = real_voxel_grid[nonzero]
-        coordinate_list = CoordinateList(coordinate_grid_in_pixels.get()[nonzero])
+        # option is not jittable unless `size` is given.
+        is_nonzero = jnp.abs(real_voxel_grid).ravel() > atol
+        nonzero = jnp.flatnonzero(is_nonzero, size=size, fill_value=0)
+        flat_potential = real_voxel_grid.ravel()[nonzero]
+        if size is not None:
+            # ... zero the potential of points used to fill out `size`
+            flat_potential = jnp.where(
+                jnp.arange(size) < jnp.count_nonzero(is_nonzero), flat_potential, 0.0
+            )
+        coordinate_list = CoordinateList(
+            coordinate_grid_in_pixels.get().reshape((-1, 3))[nonzero]
+        )
 
         return cls(flat_potential, coordinate_list, voxel_size)
 
@@ -561,6 +639,42 @@ class RealVoxelCloudPotential(AbstractVoxelPotential, strict=True):
         )
 
 
+def _next_even_smooth_size(n: int) -> int:
+    # The smallest even size at least `n` whose only prime factors are 2, 3, 5,
+    # and 7. FFTs of these sizes are fast, whereas sizes with large prime
+    # factors fall back to much slower algorithms
+    n += n % 2
+    while True:
+        m = n
+        for p in (2, 3, 5, 7):
+            while m % p == 0:
+                m //= p
+        if m == 1:
+            return n
+        n += 2
+
+
+@partial(jax.jit, static_argnames=("padded_shape", "pad_mode"))
+def _compute_fourier_voxel_grid(
+    real_voxel_grid: Float[Array, "dim dim dim"],
+    padded_shape: tuple[int, int, int],
+    pad_mode: str,
+    filter: Optional[AbstractFilter],
+) -> Complex[Array, "z_dim y_dim x_dim"]:
+    # Pad, transform, filter, and shift in one compiled function so that XLA
+    # can fuse these steps
+    padded_real_voxel_grid = pad_to_shape(real_voxel_grid, padded_shape, mode=pad_mode)
+    # For now, do not store the fourier potential only on the half space.
+    # Fourier slice extraction does not currently work if rfftn is used.
+    fourier_voxel_grid_with_zero_in_corner = fftn(padded_real_voxel_grid)
+    if filter is not None:
+        fourier_voxel_grid_with_zero_in_corner = filter(
+            fourier_voxel_grid_with_zero_in_corner
+        )
+    # ... store the potential grid with the zero frequency component in the center
+    return jnp.fft.fftshift(fourier_voxel_grid_with_zero_in_corner)
+
+
 def evaluate_3d_real_space_gaussian(
     coordinate_grid_in_angstroms: Float[Array, "z_dim y_dim x_dim 3"],
     atom_position: Float[Array, "3"],
@@ -609,19 +723,27 @@ def evaluate_3d_atom_potential(
 
     The potential of the atom evaluated on the grid.
     """
-    eval_fxn = jax.vmap(evaluate_3d_real_space_gaussian, in_axes=(None, None, 0, 0))
-    return jnp.sum(
-        eval_fxn(coordinate_grid_in_angstroms, atom_position, atomic_as, atomic_bs),
-        axis=0,
+    # Accumulate the gaussians one at a time, rather than stacking all of them
+    # and summing, so that the sum fuses without materializing each gaussian
+    potential = evaluate_3d_real_space_gaussian(
+        coordinate_grid_in_angstroms, atom_position, atomic_as[0], atomic_bs[0]
     )
+    for a, b in zip(atomic_as[1:], atomic_bs[1:]):
+        potential += evaluate_3d_real_space_gaussian(
+            coordinate_grid_in_angstroms, atom_position, a, b
+        )
+    return potential
 
 
-@jax.jit
+@partial(jax.jit, static_argnames=("batch_size", "cutoff_radius_in_voxels"))
 def build_real_space_voxels_from_atoms(
     atom_positions: Float[Array, "n_atoms 3"],
     ff_a: Float[Array, "n_atoms n_form_factors"],
     ff_b: Float[Array, "n_atoms n_form_factors"],
     coordinate_grid_in_angstroms: Float[Array, "dim dim dim 3"],
+    *,
+    batch_size: int = 1,
+    cutoff_radius_in_voxels: Optional[int] = None,
 ) -> Float[Array, "dim dim dim"]:
     """
     Build a voxel representation of an atomic model.
@@ -631,22 +753,149 @@ def build_real_space_voxels_from_atoms(
     - `atom_coords`: The coordinates of the atoms.
     - `ff_a`: Intensity values for each Gaussian in the atom
     - `ff_b` : The inverse scale factors for each Gaussian in the atom
-    - `coordinate_grid` : The coordinates of each voxel in the grid.
+    - `coordinate_grid` : The coordinates of each voxel in the grid. This must
+                          be a regular grid, such as that of a `CoordinateGrid`.
+    - `batch_size` : The number of atoms whose potentials are evaluated
+                     at once. Larger batches can be faster on GPU, but use
+                     memory proportional to `batch_size` times the size of
+                     the grid. On CPU, a batch size of one is typically fastest.
+    - `cutoff_radius_in_voxels` : If given, each atom's potential is only
+                                  evaluated in a box of voxels extending this
+                                  many voxels in each direction from the voxel
+                                  nearest to the atom, and is zero outside of it.
+                                  This reduces the cost per atom from the size of
+                                  the grid to the size of the box. The potential
+                                  of an atom decays to a relative tolerance `eps`
+                                  at a distance `sqrt(-b * log(eps)) / (2 * pi)`
+                                  from it, where `b` is its largest scale factor.
 
     **Returns:**
 
     The voxel representation of the atomic model.
     """
-    voxel_grid_buffer = jnp.zeros(coordinate_grid_in_angstroms.shape[:-1])
+    # Pad the atoms to a whole number of batches. Padded atoms have
+    # zero amplitude, so they do not contribute to the potential
+    n_atoms = atom_positions.shape[0]
+    n_batches = -(-n_atoms // batch_size)
+    n_padding = n_batches * batch_size - n_atoms
+    atom_positions = jnp.pad(atom_positions, ((0, n_padding), (0, 0)))
+    ff_a = jnp.pad(ff_a, ((0, n_padding), (0, 0)))
+    ff_b = jnp.pad(ff_b, ((0, n_padding), (0, 0)), constant_values=1.0)
+    # Compute the gaussian widths and amplitudes once per atom, rather than
+    # once per voxel
+    b_inverses = 4.0 * jnp.pi / ff_b
+    amplitudes = ff_a * b_inverses ** (3.0 / 2.0)
+    # Store the grid as its 1D axes, in (z, y, x) order. The grid is a
+    # tensor product of these, with components in (x, y, z) order
+    grid_axes = (
+        coordinate_grid_in_angstroms[:, 0, 0, 2],
+        coordinate_grid_in_angstroms[0, :, 0, 1],
+        coordinate_grid_in_angstroms[0, 0, :, 0],
+    )
+
+    evaluate_batch = jax.vmap(
+        _evaluate_3d_atom_potential_from_amplitudes, in_axes=(None, 0, 0, 0)
+    )
 
-    def add_gaussian_to_potential(i, potential):
-        potential += evaluate_3d_atom_potential(
-            coordinate_grid_in_angstroms, atom_positions[i], ff_a[i], ff_b[i]
+    if cutoff_radius_in_voxels is None:
+
+        def add_batch_to_potential(potential, batch):
+            positions, batch_amplitudes, batch_b_inverses = batch
+            potential += jnp.sum(
+                evaluate_batch(
+                    grid_axes,
+                    positions,
+                    batch_amplitudes,
+                    batch_b_inverses,
+                ),
+                axis=0,
+            )
+            return potential, None
+
+    else:
+        grid_shape = coordinate_grid_in_angstroms.shape[:-1]
+        box_shape = tuple(
+            min(2 * cutoff_radius_in_voxels + 1, n_voxels) for n_voxels in grid_shape
         )
-        return potential
 
-    voxel_grid = jax.lax.fori_loop(
-        0, atom_positions.shape[0], add_gaussian_to_potential, voxel_grid_buffer
+        def get_box_start(atom_position):
+            # The corner of the box centered on the voxel nearest to the atom,
+            # shifted to lie within the grid
+            return jnp.asarray(
+                [
+                    jnp.clip(
+                        jnp.argmin(jnp.abs(axis - x)) - cutoff_radius_in_voxels,
+                        0,
+                        n_voxels - n_box,
+                    )
+                    for axis, x, n_voxels, n_box in zip(
+                        grid_axes,
+                        atom_position[::-1],
+                        grid_shape,
+                        box_shape,
+                    )
+                ]
+            )
+
+        def evaluate_atom_in_box(box_start, atom_position, amplitudes, b_inverses):
+            box_axes = tuple(
+                jax.lax.dynamic_slice_in_dim(axis, start, n_box)
+                for axis, start, n_box in zip(grid_axes, box_start, box_shape)
+            )
+            return _evaluate_3d_atom_potential_from_amplitudes(
+                box_axes, atom_position, amplitudes, b_inverses
+            )
+
+        def add_batch_to_potential(potential, batch):
+            positions, batch_amplitudes, batch_b_inverses = batch
+            box_starts = jax.vmap(get_box_start)(positions)
+            boxes = jax.vmap(evaluate_atom_in_box)(
+                box_starts, positions, batch_amplitudes, batch_b_inverses
+            )
+            # ... scatter-add all boxes of the batch into the potential at once
+            z_index, y_index, x_index = (
+                box_starts[:, i, None] + jnp.arange(n_box)
+                for i, n_box in enumerate(box_shape)
+            )
+            potential = potential.at[
+                z_index[:, :, None, None],
+                y_index[:, None, :, None],
+                x_index[:, None, None, :],
+            ].add(boxes)
+            return potential, None
+
+    voxel_grid, _ = jax.lax.scan(
+        add_batch_to_potential,
+        jnp.zeros(coordinate_grid_in_angstroms.shape[:-1]),
+        (
+            atom_positions.reshape((n_batches, batch_size, 3)),
+            amplitudes.reshape((n_batches, batch_size, -1)),
+            b_inverses.reshape((n_batches, batch_size, -1)),
+        ),
     )
 
     return voxel_grid
+
+
+def _evaluate_3d_atom_potential_from_amplitudes(
+    grid_axes: tuple[
+        Float[Array, " z_dim"], Float[Array, " y_dim"], Float[Array, " x_dim"]
+    ],
+    atom_position: Float[Array, "3"],
+    amplitudes: Float[Array, " n_form_factors"],
+    b_inverses: Float[Array, " n_form_factors"],
+) -> Float[Array, "z_dim y_dim x_dim"]:
+    # The same as `evaluate_3d_atom_potential`, but with the gaussian
+    # amplitudes and inverse widths precomputed, and on the grid given by
+    # its 1D axes. An isotropic gaussian is the outer product of 1D gaussians
+    # along each axis, so only evaluate exponentials on the axes and sum
+    # the outer products over the atom's gaussians
+    z_axis, y_axis, x_axis = grid_axes
+    x, y, z = atom_position
+    gaussian_z, gaussian_y, gaussian_x = (
+        jnp.exp(-jnp.pi * b_inverses[:, None] * ((axis - r) ** 2)[None, :])
+        for axis, r in ((z_axis, z), (y_axis, y), (x_axis, x))
+    )
+    return jnp.einsum(
+        "kz,ky,kx->zyx", amplitudes[:, None] * gaussian_z, gaussian_y, gaussian_x
+    )
@@ -7,7 +7,9 @@ from functools import cached_property
 from typing import Any, Optional
 from typing_extensions import override
 
+import equinox as eqx
 import jax
+import jax.tree_util as jtu
 from equinox import AbstractVar, Module
 from jaxtyping import Array, Complex, PRNGKeyArray
 
@@ -138,20 +140,27 @@ class DiscreteEnsemble(AbstractEnsemble, strict=True):
 
     **Attributes:**
 
-    - `potential`: A tuple of scattering potential representations.
+    - `potential`: A tuple of scattering potential representations, or
+                   a single scattering potential representation whose array
+                   leaves are stacked along a leading axis that indexes the
+                   conformation. Indexing the stacked representation
+                   vectorizes under `jax.vmap`, unlike selecting from the
+                   tuple with `jax.lax.switch`.
     - `pose`: The pose of the specimen.
     - `conformation`: A conformation with a discrete index at which to evaluate
                       the scattering potential tuple.
     """
 
-    potential: tuple[AbstractScatteringPotential, ...]
+    potential: tuple[AbstractScatteringPotential, ...] | AbstractScatteringPotential
     integrator: AbstractPotentialIntegrator
     pose: AbstractPose
     conformation: DiscreteConformation
 
     def __init__(
         self,
-        potential: tuple[AbstractScatteringPotential, ...],
+        potential: (
+            tuple[AbstractScatteringPotential, ...] | AbstractScatteringPotential
+        ),
         integrator: AbstractPotentialIntegrator,
         pose: Optional[AbstractPose] = None,
         conformation: Optional[DiscreteConformation] = None,
@@ -165,7 +174,14 @@ class DiscreteEnsemble(AbstractEnsemble, strict=True):
     @override
     def potential_in_com_frame(self) -> AbstractScatteringPotential:
         """Get the scattering potential at configured conformation."""
-        funcs = [lambda i=i: self.potential[i] for i in range(len(self.potential))]
-        potential = jax.lax.switch(self.conformation.value, funcs)
+        if isinstance(self.potential, AbstractScatteringPotential):
+            # ... index the array leaves of a stacked potential
+            potential = jtu.tree_map(
+                lambda x: x[self.conformation.value] if eqx.is_array(x) else x,
+                self.potential,
+            )
+        else:
+            funcs = [lambda i=i: self.potential[i] for i in range(len(self.potential))]
+            potential = jax.lax.switch(self.conformation.value, funcs)
 
         return potential
@@ -4,8 +4,15 @@ import equinox as eqx
 import jax
 import jax.numpy as jnp
 import jax.tree_util as jtu
+import numpy as np
 
-from cryojax.simulator import DiscreteConformation, DiscreteEnsemble, Instrument
+from cryojax.simulator import (
+    DiscreteConformation,
+    DiscreteEnsemble,
+    FourierSliceExtract,
+    FourierVoxelGridPotential,
+    Instrument,
+)
 
 
 def test_conformation(potential, pose, integrator, config):
@@ -42,3 +49,28 @@ def test_conformation_vmap(potential, pose, integrator, config):
     # Vmap over conformations
     image_stack = compute_conformation_stack(vmap, novmap, config)
     assert image_stack.shape[0] == ensemble.conformation.value.shape[0]
+
+
+def test_stacked_potential_agrees_with_tuple():
+    rng = np.random.default_rng(0)
+    potentials = tuple(
+        FourierVoxelGridPotential.from_real_voxel_grid(rng.normal(size=(8, 8, 8)), 1.0)
+        for _ in range(3)
+    )
+    stacked_potential = jtu.tree_map(lambda *xs: jnp.stack(xs), *potentials)
+    integrator = FourierSliceExtract()
+
+    @jax.vmap
+    def get_potentials(value):
+        conformation = DiscreteConformation(value)
+        return (
+            DiscreteEnsemble(
+                potentials, integrator, conformation=conformation
+            ).potential_in_com_frame,
+            DiscreteEnsemble(
+                stacked_potential, integrator, conformation=conformation
+            ).potential_in_com_frame,
+        )
+
+    from_tuple, from_stack = get_potentials(jnp.asarray((2, 0, 1)))
+    assert eqx.tree_equal(from_tuple, from_stack)
@@ -3,7 +3,7 @@ import jax.numpy as jnp
 import numpy as np
 import pytest
 
-from cryojax.image import fftn, ifftn
+from cryojax.image import fftn, ifftn, irfftn, rfftn
 
 
 jax.config.update("jax_enable_x64", True)
@@ -35,3 +35,60 @@ def test_fft(model, request):
     np.testing.assert_allclose(
         fftn(image)[0, 0], fftn(ifftn(fftn(image)).real)[0, 0], atol=1e-12
     )
+
+
+@pytest.mark.parametrize(
+    "shape, axes",
+    [
+        ((8, 10), None),
+        ((7, 10), None),
+        ((6, 8, 10), None),
+        ((5, 8, 10), (-2, -1)),
+        ((6, 7, 10), (0, 2)),
+    ],
+)
+def test_fft_agrees_with_shifts(shape, axes):
+    random = jnp.asarray(np.random.randn(*shape))
+    np.testing.assert_allclose(
+        fftn(random, axes=axes),
+        jnp.fft.fftn(jnp.fft.ifftshift(random, axes=axes), axes=axes),
+        atol=1e-12,
+    )
+    ft = jnp.fft.fftn(random, axes=axes)
+    np.testing.assert_allclose(
+        ifftn(ft, axes=axes),
+        jnp.fft.fftshift(jnp.fft.ifftn(ft, axes=axes), axes=axes),
+        atol=1e-12,
+    )
+
+
+@pytest.mark.parametrize(
+    "shape, axes",
+    [
+        ((8, 10), None),
+        ((7, 10), None),
+        ((8, 7), None),
+        ((6, 8, 10), None),
+        ((5, 8, 10), (-2, -1)),
+        ((6, 7, 10), (0, 2)),
+    ],
+)
+def test_rfft_agrees_with_shifts(shape, axes):
+    random = jnp.asarray(np.random.randn(*shape))
+    np.testing.assert_allclose(
+        rfftn(random, axes=axes),
+        jnp.fft.rfftn(jnp.fft.ifftshift(random, axes=axes), axes=axes),
+        atol=1e-12,
+    )
+    ft = jnp.fft.rfftn(random, axes=axes)
+    s = tuple(shape[axis] for axis in (range(len(shape)) if axes is None else axes))
+    np.testing.assert_allclose(
+        irfftn(ft, s=s, axes=axes),
+        jnp.fft.fftshift(jnp.fft.irfftn(ft, s=s, axes=axes), axes=axes),
+        atol=1e-12,
+    )
+    np.testing.assert_allclose(
+        irfftn(ft, axes=axes),
+        jnp.fft.fftshift(jnp.fft.irfftn(ft, axes=axes), axes=axes),
+        atol=1e-12,
+    )
@@ -0,0 +1,54 @@
+import equinox as eqx
+import jax
+import jax.numpy as jnp
+import numpy as np
+
+from cryojax.core import (
+    filter_grad_with_spec,
+    filter_value_and_grad_with_spec,
+    filter_vmap_with_spec,
+)
+
+
+class Model(eqx.Module):
+    a: jax.Array
+    b: jax.Array
+
+
+def loss(model, x):
+    return jnp.sum(model.a * x + model.b**2)
+
+
+def test_grad_only_at_filter_spec():
+    model = Model(jnp.asarray(2.0), jnp.asarray(3.0))
+    filter_spec = Model(True, False)  # type: ignore
+    x = jnp.asarray([1.0, 2.0])
+    grad_fn = filter_grad_with_spec(loss, filter_spec)
+    value_and_grad_fn = filter_value_and_grad_with_spec(loss, filter_spec)
+    # Call twice to exercise the cached transformation
+    for _ in range(2):
+        grads = grad_fn(model, x)
+        value, grads_from_value_and_grad = value_and_grad_fn(model, x)
+        np.testing.assert_allclose(grads.a, 3.0)
+        assert grads.b is None
+        np.testing.assert_allclose(value, loss(model, x))
+        np.testing.assert_allclose(grads_from_value_and_grad.a, 3.0)
+
+
+def test_vmap_only_at_filter_spec():
+    model = Model(jnp.arange(4.0), jnp.asarray(3.0))
+    filter_spec = Model(True, False)  # type: ignore
+    x = jnp.arange(4.0)
+    vmap_fn = filter_vmap_with_spec(lambda m, x: m.a * x + m.b, filter_spec)
+    for _ in range(2):
+        np.testing.assert_allclose(vmap_fn(model, x), model.a * x + model.b)
+
+
+def test_vmap_with_tuple_in_axes():
+    model = Model(jnp.arange(4.0), jnp.asarray(3.0))
+    filter_spec = Model(True, False)  # type: ignore
+    x, y = jnp.arange(4.0), jnp.asarray(2.0)
+    vmap_fn = filter_vmap_with_spec(
+        lambda m, x, y: m.a * x + m.b * y, filter_spec, in_axes=(0, 0, None)
+    )
+    np.testing.assert_allclose(vmap_fn(model, x, y), model.a * x + model.b * y)
@@ -0,0 +1,86 @@
+import jax.numpy as jnp
+import numpy as np
+import pytest
+from jax import config
+from scipy import ndimage
+
+from cryojax.image import compute_spline_coefficients, map_coordinates
+
+
+config.update("jax_enable_x64", True)
+
+
+@pytest.mark.parametrize("shape", [(9, 12), (8, 10, 7)])
+@pytest.mark.parametrize("order", [0, 1])
+def test_agrees_with_scipy_in_bounds(shape, order):
+    rng = np.random.default_rng(0)
+    data = rng.normal(size=shape)
+    coordinates = [rng.uniform(0, s - 1, size=(5, 6)) for s in shape]
+    np.testing.assert_allclose(
+        map_coordinates(jnp.asarray(data), coordinates, order),
+        ndimage.map_coordinates(data, coordinates, order=order),
+        atol=1e-12,
+    )
+
+
+@pytest.mark.parametrize("order", [0, 1])
+def test_fill_out_of_bounds(order):
+    data = jnp.ones((4, 5))
+    coordinates = [jnp.asarray([-3.0, 1.0, 10.0]), jnp.asarray([2.0, 20.0, 2.0])]
+    np.testing.assert_allclose(
+        map_coordinates(data, coordinates, order, mode="fill", cval=-1.0),
+        jnp.asarray([-1.0, -1.0, -1.0]),
+    )
+
+
+def test_fill_negative_indices():
+    # Nodes at negative indices take the value `cval`, rather than wrapping
+    data = jnp.asarray([1.0, 2.0, 3.0, 4.0, 5.0])
+    np.testing.assert_allclose(
+        map_coordinates(data, [jnp.asarray([-0.25])], 1, mode="fill", cval=-1.0),
+        jnp.asarray([0.75 * 1.0 + 0.25 * -1.0]),
+    )
+
+
+@pytest.mark.parametrize("shape", [(9, 12), (8, 10, 7)])
+def test_cubic_spline_interpolates_nodes(shape):
+    rng = np.random.default_rng(0)
+    data = rng.normal(size=shape) + 1j * rng.normal(size=shape)
+    nodes = np.meshgrid(*[np.arange(s, dtype=float) for s in shape], indexing="ij")
+    np.testing.assert_allclose(
+        map_coordinates(jnp.asarray(data), nodes, 3), data, atol=1e-12
+    )
+
+
+@pytest.mark.parametrize("order", [0, 1, 3])
+def test_stacked_coordinates(order):
+    rng = np.random.default_rng(0)
+    data = jnp.asarray(rng.normal(size=(8, 10, 7)))
+    coordinates = [rng.uniform(0, s - 1, size=(5, 6)) for s in data.shape]
+    np.testing.assert_allclose(
+        map_coordinates(data, jnp.stack(coordinates), order),
+        map_coordinates(data, coordinates, order),
+    )
+
+
+@pytest.mark.parametrize("order", [0, 1, 3])
+def test_broadcast_coordinates(order):
+    rng = np.random.default_rng(0)
+    data = jnp.asarray(rng.normal(size=(9, 12)))
+    coordinates = [rng.uniform(0, 8, size=(5, 6)), rng.uniform(0, 11, size=(6,))]
+    np.testing.assert_allclose(
+        map_coordinates(data, coordinates, order),
+        map_coordinates(
+            data, [coordinates[0], np.broadcast_to(coordinates[1], (5, 6))], order
+        ),
+    )
+
+
+def test_cubic_spline_short_axes():
+    data = jnp.asarray([1.0, 5.0, 2.0])
+    assert compute_spline_coefficients(data).shape == (5,)
+    np.testing.assert_allclose(
+        map_coordinates(data, [jnp.arange(3.0)], 3), data, atol=1e-12
+    )
+    with pytest.raises(ValueError):
+        compute_spline_coefficients(jnp.asarray([1.0, 5.0]))
@@ -4,6 +4,8 @@ import equinox as eqx
 import jax
 import jax.numpy as jnp
 import jax.tree_util as jtu
+import numpy as np
+import pytest
 from jaxtyping import Array, Float
 
 import cryojax.simulator as cs
@@ -13,7 +15,9 @@ from cryojax.coordinates import (
     CoordinateGrid,
     CoordinateList,
     FrequencySlice,
+    make_frequencies,
 )
+from cryojax.image.operators import LowpassFilter
 
 
 def test_voxel_electron_potential_loaders():
@@ -48,6 +52,19 @@ def test_voxel_electron_potential_loaders():
     )
 
 
+@pytest.mark.parametrize("shape", [(8, 8, 8), (7, 7, 7)])
+def test_fourier_voxel_grid_matches_fftn(shape):
+    real_voxel_grid = jax.random.normal(jax.random.PRNGKey(0), shape)
+    fourier_potential = cs.FourierVoxelGridPotential.from_real_voxel_grid(
+        real_voxel_grid, voxel_size=1.0
+    )
+    np.testing.assert_allclose(
+        fourier_potential.fourier_voxel_grid,
+        jnp.fft.fftshift(jnp.fft.fftn(jnp.fft.ifftshift(real_voxel_grid))),
+        atol=1e-4,
+    )
+
+
 def test_electron_potential_vmap(potential, integrator, config):
     filter_spec = jtu.tree_map(
         lambda x: not isinstance(x, AbstractCoordinates),
@@ -112,3 +129,88 @@ def test_electron_potential_vmap_with_pipeline(potential, pose, integrator, conf
     # vmap over first axis
     image_stack = compute_image_stack(vmap, novmap)
     assert image_stack.shape[:1] == (1,)
+
+
+def test_voxel_cloud_potential_with_size():
+    real_voxel_grid = jnp.zeros((6, 6, 6)).at[1, 2, 3].set(1.0).at[4, 0, 5].set(-2.0)
+    cloud_potential = cs.RealVoxelCloudPotential.from_real_voxel_grid(
+        real_voxel_grid, voxel_size=1.0
+    )
+    make_potential = jax.jit(
+        partial(cs.RealVoxelCloudPotential.from_real_voxel_grid, size=4)
+    )
+    padded_cloud_potential = make_potential(real_voxel_grid, 1.0)
+    np.testing.assert_allclose(cloud_potential.voxel_weights, jnp.asarray([1.0, -2.0]))
+    np.testing.assert_allclose(
+        padded_cloud_potential.voxel_weights, jnp.asarray([1.0, -2.0, 0.0, 0.0])
+    )
+    np.testing.assert_allclose(
+        padded_cloud_potential.wrapped_coordinate_list_in_pixels.get()[:2],
+        cloud_potential.wrapped_coordinate_list_in_pixels.get(),
+    )
+
+
+def test_interpolator_from_coefficients():
+    fourier_voxel_grid = jnp.fft.fftn(
+        jax.random.normal(jax.random.PRNGKey(0), (8, 8, 8))
+    )
+    frequency_slice = FrequencySlice((8, 8), half_space=False)
+    potential = cs.FourierVoxelGridPotentialInterpolator(
+        fourier_voxel_grid, frequency_slice, 1.1
+    )
+    make_potential = jax.jit(cs.FourierVoxelGridPotentialInterpolator.from_coefficients)
+    potential_from_coefficients = make_potential(
+        potential.coefficients, frequency_slice, 1.1
+    )
+    assert eqx.tree_equal(potential, potential_from_coefficients)
+    assert potential_from_coefficients.shape == (8, 8, 8)
+    with pytest.raises(ValueError):
+        cs.FourierVoxelGridPotentialInterpolator(
+            fourier_voxel_grid,
+            frequency_slice,
+            1.1,
+            coefficients=potential.coefficients,
+        )
+
+
+def test_interpolator_with_bfloat16_coefficients():
+    fourier_voxel_grid = jnp.fft.fftn(
+        jax.random.normal(jax.random.PRNGKey(0), (8, 8, 8))
+    )
+    frequency_slice = FrequencySlice((8, 8), half_space=False)
+    potential = cs.FourierVoxelGridPotentialInterpolator(
+        fourier_voxel_grid, frequency_slice, 1.1
+    )
+    potential_in_bfloat16 = cs.FourierVoxelGridPotentialInterpolator(
+        fourier_voxel_grid, frequency_slice, 1.1, coefficient_dtype=jnp.bfloat16
+    )
+    assert potential_in_bfloat16.coefficients.dtype == jnp.bfloat16
+    assert potential_in_bfloat16.shape == potential.shape
+    pose = cs.EulerAnglePose(view_phi=30.0, view_theta=50.0, view_psi=-20.0)
+    projection = cs.extract_slice_with_cubic_spline(
+        potential.coefficients,
+        potential.rotate_to_pose(pose).wrapped_frequency_slice_in_pixels.get(),
+    )
+    projection_in_bfloat16 = cs.extract_slice_with_cubic_spline(
+        potential_in_bfloat16.coefficients,
+        potential_in_bfloat16.rotate_to_pose(
+            pose
+        ).wrapped_frequency_slice_in_pixels.get(),
+    )
+    assert projection_in_bfloat16.dtype == projection.dtype
+    np.testing.assert_allclose(
+        projection_in_bfloat16, projection, atol=1e-2 * np.abs(projection).max()
+    )
+
+
+def test_fourier_voxel_grid_padding_with_filter():
+    real_voxel_grid = jax.random.normal(jax.random.PRNGKey(0), (40, 40, 40))
+    filter = LowpassFilter(make_frequencies((52, 52, 52), half_space=False))
+    potential = cs.FourierVoxelGridPotential.from_real_voxel_grid(
+        real_voxel_grid, 1.0, pad_scale=1.3, filter=filter
+    )
+    assert potential.shape == (52, 52, 52)
+    potential = cs.FourierVoxelGridPotential.from_real_voxel_grid(
+        real_voxel_grid, 1.0, pad_scale=1.3, fft_friendly_padding=True
+    )
+    assert potential.shape == (54, 54, 54)
@@ -97,6 +97,51 @@ class TestBuildRealSpaceVoxelsFromAtoms:
         integral = jnp.sum(real_voxel_grid) * voxel_size**3
         assert jnp.isclose(integral, jnp.sum(ff_a))
 
+    @pytest.mark.parametrize("batch_size", [2, 3, 8])
+    def test_batch_size_does_not_change_potential(self, toy_gaussian_cloud, batch_size):
+        (
+            atom_positions,
+            ff_a,
+            ff_b,
+            n_voxels_per_side,
+            voxel_size,
+        ) = toy_gaussian_cloud
+        coordinate_grid = CoordinateGrid(n_voxels_per_side, voxel_size)
+
+        real_voxel_grid = build_real_space_voxels_from_atoms(
+            atom_positions, ff_a, ff_b, coordinate_grid.get()
+        )
+        batched_real_voxel_grid = build_real_space_voxels_from_atoms(
+            atom_positions, ff_a, ff_b, coordinate_grid.get(), batch_size=batch_size
+        )
+
+        np.testing.assert_allclose(batched_real_voxel_grid, real_voxel_grid, atol=1e-12)
+
+    @pytest.mark.parametrize("batch_size", [1, 3])
+    def test_cutoff_matches_full_grid(self, toy_gaussian_cloud, batch_size):
+        (
+            atom_positions,
+            ff_a,
+            ff_b,
+            n_voxels_per_side,
+            voxel_size,
+        ) = toy_gaussian_cloud
+        coordinate_grid = CoordinateGrid(n_voxels_per_side, voxel_size)
+
+        real_voxel_grid = build_real_space_voxels_from_atoms(
+            atom_positions, ff_a, ff_b, coordinate_grid.get()
+        )
+        cutoff_real_voxel_grid = build_real_space_voxels_from_atoms(
+            atom_positions,
+            ff_a,
+            ff_b,
+            coordinate_grid.get(),
+            batch_size=batch_size,
+            cutoff_radius_in_voxels=12,
+        )
+
+        np.testing.assert_allclose(cutoff_real_voxel_grid, real_voxel_grid, atol=1e-12)
+
 
 class TestBuildVoxelsFromTrajectories:
     def test_indexing_matches_individual_calls(self, toy_gaussian_cloud):